@@ -1,18 +1,144 @@
 from abc import ABC, abstractmethod
-from github import Github, Auth
-from typing import Optional, List, Dict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Awaitable, ClassVar, Mapping, Tuple, Union
+import asyncio
+import base64
+import hashlib
+import itertools
 import os
 import logging
+import aiohttp
+import orjson
+from urllib.parse import urlencode
+from .gh_cache import ShaCache, is_sha
+from .query_coalescer import QueryCoalescer
+from .rate_limiter import RateLimiter
+
+REST_URL = "https://api.github.com"
+GRAPHQL_URL = f"{REST_URL}/graphql"
+
+# How long a cached REST response is served without revalidating its ETag
+ETAG_TTL_SECONDS = 30
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize to JSON with sorted keys, so equal payloads serialize identically."""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def _gql_key(query: str, variables: Dict[str, Any]) -> bytes:
+    """Key under which identical GraphQL queries are coalesced."""
+    return hashlib.blake2b((query + _dumps(variables)).encode()).digest()
+
+OPEN_PRS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(states: OPEN, first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        title
+        body
+        author { login }
+        url
+        createdAt
+        reviews(first: 100) {
+          nodes { author { login } }
+        }
+      }
+    }
+  }
+}
+"""
+
+PR_SNAPSHOT_QUERY = """
+query($owner: String!, $name: String!, $number: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      number
+      title
+      body
+      headRefName
+      headRefOid
+      baseRefOid
+      baseRef { target { oid } }
+      commits(first: 100) {
+        pageInfo { hasNextPage }
+        nodes { commit { oid message } }
+      }
+      lastCommit: commits(last: 1) {
+        nodes {
+          commit {
+            statusCheckRollup {
+              contexts(first: 50) {
+                nodes {
+                  ... on CheckRun { name conclusion }
+                  ... on StatusContext { context state }
+                }
+              }
+            }
+          }
+        }
+      }
+      reviews(last: 50) {
+        nodes {
+          author { login }
+          state
+        }
+      }
+    }
+  }
+}
+"""
+
+@dataclass
+class PRSnapshot:
+    """A pull request with its commits, checks and reviews, as read in one query."""
+    number: int
+    title: str
+    body: Optional[str]
+    head_ref: str
+    head_sha: str
+    # Base commit the PR was opened against, and the base branch's current head
+    base_sha: str
+    head_base_sha: Optional[str]
+    commits: List[Dict] = field(default_factory=list)
+    checks: List[Dict] = field(default_factory=list)
+    reviews: List[Dict] = field(default_factory=list)
 
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
+
+    # Connection pool shared by every agent in the process
+    _session: ClassVar[Optional[aiohttp.ClientSession]] = None
+    _session_loop: ClassVar[Optional[asyncio.AbstractEventLoop]] = None
+    # Rate-limit state per (token, resource), shared by every agent using that token;
+    # GitHub budgets REST ("core") and GraphQL requests separately
+    _rate_limiters: ClassVar[Dict[Tuple[str, str], RateLimiter]] = {}
+    # Lets concurrent agents share identical GraphQL queries
+    _coalescer: ClassVar[QueryCoalescer] = QueryCoalescer()
+    # Content read at a commit SHA, plus ETag-validated REST responses
+    _cache: ClassVar[ShaCache] = ShaCache(ttl=ETAG_TTL_SECONDS)
     
-    def __init__(self, github_token: str, repo_name: str):
-        auth = Auth.Token(github_token)
-        self.github = Github(auth=auth)
-        self.repo = self.github.get_repo(repo_name)
+    def __init__(self, github_tokens: Union[str, List[str]], repo_name: str,
+                 http: Optional[aiohttp.ClientSession] = None,
+                 gh_sem: Optional[asyncio.Semaphore] = None):
+        self._tokens = github_tokens if isinstance(github_tokens, list) else [github_tokens]
+        self._token_idx = itertools.cycle(range(len(self._tokens)))
+        # Session owned by the caller; agents without one share a lazily created pool
+        self._http = http
+        # Bounds in-flight GitHub requests; pass one semaphore to share the bound
+        self._gh_sem = gh_sem or asyncio.Semaphore(int(os.getenv("GH_MAX_CONCURRENCY", "8")))
+
+        self.repo_owner, self.repo_short_name = repo_name.split("/", 1)
+        self.repo_path = f"/repos/{repo_name}"
+        self._bot_login: Optional[str] = None
         self.logger = logging.getLogger(self.__class__.__name__)
 
+        # Bounds how many PRs this agent works on at once
+        self._sem = asyncio.Semaphore(int(os.getenv("AGENT_CONCURRENCY", "8")))
+
     @property
     @abstractmethod
     def role(self) -> str:
@@ -24,73 +150,435 @@ class BaseAgent(ABC):
         """Main processing loop for the agent."""
         pass
 
-    def create_pull_request(self, branch: str, title: str, body: str, base: str = "main") -> Optional[Dict]:
+    async def get_bot_login(self) -> str:
+        """Login of the account the agent acts as, fetched once."""
+        if self._bot_login is None:
+            # Pinned to the first token, the account every write is made as
+            _, _, user = await self._throttled("GET", f"{REST_URL}/user", token=self._tokens[0])
+            self._bot_login = user["login"]
+        return self._bot_login
+
+    async def create_pull_request(self, branch: str, title: str, body: str, base: str = "main") -> Optional[Dict]:
         """Create a new pull request."""
         try:
-            pr = self.repo.create_pull(
-                title=title,
-                body=body,
-                head=branch,
-                base=base
-            )
-            self.logger.info(f"Created PR #{pr.number}: {title}")
+            pr = await self._rest_async("POST", f"{self.repo_path}/pulls", json={
+                "title": title,
+                "body": body,
+                "head": branch,
+                "base": base
+            })
+            self.logger.info("Created PR #%s: %s", pr["number"], title)
             return {
-                "number": pr.number,
-                "url": pr.html_url,
-                "id": pr.id
+                "number": pr["number"],
+                "url": pr["html_url"],
+                "id": pr["id"]
             }
         except Exception as e:
-            self.logger.error(f"Failed to create PR: {str(e)}")
+            self.logger.error("Failed to create PR: %s", e)
             return None
 
-    def comment_on_pr(self, pr_number: int, comment: str) -> bool:
+    async def comment_on_pr(self, pr_number: int, comment: str) -> bool:
         """Add a comment to a pull request."""
         try:
-            pr = self.repo.get_pull(pr_number)
-            pr.create_issue_comment(comment)
-            self.logger.info(f"Added comment to PR #{pr_number}")
+            await self._rest_async("POST", f"{self.repo_path}/issues/{pr_number}/comments",
+                                   json={"body": comment})
+            self.logger.info("Added comment to PR #%s", pr_number)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to comment on PR #{pr_number}: {str(e)}")
+            self.logger.error("Failed to comment on PR #%s: %s", pr_number, e)
             return False
+        finally:
+            self._forget_pr_snapshot(pr_number)
+
+    async def _process_concurrently(self, handler: Callable[[Dict], Awaitable[None]],
+                                    prs: List[Dict]) -> None:
+        """Run `handler` over all PRs concurrently, logging individual failures."""
+        results = await asyncio.gather(*(handler(pr) for pr in prs), return_exceptions=True)
+        for pr, result in zip(prs, results):
+            if isinstance(result, Exception):
+                self.logger.error("Failed to process PR #%s: %s", pr["number"], result)
+
+    @staticmethod
+    def create_session() -> aiohttp.ClientSession:
+        """Create an HTTP session configured for the GitHub API."""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=10, keepalive_timeout=60),
+            headers={
+                "Accept": "application/vnd.github+json",
+                "Accept-Encoding": "gzip",
+                "User-Agent": "github-agent-collab/1.0"
+            },
+            json_serialize=_dumps
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the agent's HTTP session, falling back to the shared pool."""
+        if self._http is not None:
+            return self._http
+        loop = asyncio.get_running_loop()
+        session = BaseAgent._session
+        if session is None or session.closed or BaseAgent._session_loop is not loop:
+            BaseAgent._session = self.create_session()
+            BaseAgent._session_loop = loop
+        return BaseAgent._session
+
+    @staticmethod
+    async def aclose() -> None:
+        """Close the HTTP session shared by all agents."""
+        session = BaseAgent._session
+        if session is not None and not session.closed:
+            await session.close()
+        BaseAgent._session = None
+        BaseAgent._session_loop = None
+
+    @staticmethod
+    def _limiter_for(token: str, resource: str = "core") -> RateLimiter:
+        """Get the rate limiter tracking a token's budget for one API resource."""
+        return BaseAgent._rate_limiters.setdefault((token, resource), RateLimiter())
+
+    @staticmethod
+    def _resource_for(url: str) -> str:
+        """Name the rate-limit resource a request to `url` is charged to."""
+        return "graphql" if url == GRAPHQL_URL else "core"
+
+    def _next_token(self, resource: str = "core") -> str:
+        """Pick the next token in rotation, skipping those with a depleted `resource` budget."""
+        start = next(self._token_idx)
+        candidates = [self._tokens[(start + offset) % len(self._tokens)]
+                      for offset in range(len(self._tokens))]
+        for token in candidates:
+            if not self._limiter_for(token, resource).is_depleted():
+                return token
+        # Every token is depleted: use the one that resets first
+        return min(candidates, key=lambda token: self._limiter_for(token, resource).reset)
+
+    def get_rate_status(self, resource: str = "core") -> Dict:
+        """Get the last known GitHub rate-limit state for `resource` across this agent's tokens."""
+        limiters = [self._limiter_for(token, resource) for token in self._tokens]
+        known = [limiter.remaining for limiter in limiters if limiter.remaining is not None]
+        return {
+            "remaining": sum(known) if known else None,
+            "reset": min((limiter.reset for limiter in limiters if limiter.reset is not None),
+                         default=None),
+            "depleted": all(limiter.is_depleted() for limiter in limiters)
+        }
+
+    async def _throttled(self, method: str, url: str, token: Optional[str] = None,
+                         **kwargs) -> Tuple[int, Mapping[str, str], Any]:
+        """Send a request, pausing for rate limits and retrying throttled responses.
+
+        Requests rotate through the agent's tokens unless a `token` is given.
+        """
+        extra_headers = kwargs.pop("headers", {})
+        resource = self._resource_for(url)
+        attempt = 0
+        while True:
+            request_token = token or self._next_token(resource)
+            limiter = self._limiter_for(request_token, resource)
+            headers = {"Authorization": f"bearer {request_token}", **extra_headers}
+            await limiter.wait()
+            async with self._gh_sem:
+                async with self._get_session().request(method, url, headers=headers, **kwargs) as response:
+                    # GitHub names the bucket it charged, which is the one to update
+                    charged = response.headers.get("X-RateLimit-Resource", resource)
+                    limiter = self._limiter_for(request_token, charged)
+                    limiter.update(response.headers)
+                    # orjson parses the raw bytes, so only error bodies are decoded
+                    body = await response.read()
+                    throttled = response.status in (403, 429)
+                    delay = limiter.retry_delay(response.status, response.headers,
+                                                body.decode(errors="replace") if throttled else "",
+                                                attempt)
+                    if delay is None:
+                        response.raise_for_status()
+                        return response.status, response.headers, orjson.loads(body) if body else None
+            self.logger.warning("GitHub rate limit hit, retrying in %.0fs", delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _rest_async(self, method: str, path: str,
+                          params: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """Call the REST API, revalidating cached GET responses with their ETag."""
+        url = f"{REST_URL}{path}"
+        if method != "GET":
+            # Writes always act as the primary token's account
+            _, _, body = await self._throttled(method, url, token=self._tokens[0],
+                                               params=params, **kwargs)
+            return body
+
+        key = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        cached = BaseAgent._cache.get_etag(key)
+        if cached and BaseAgent._cache.is_fresh(cached):
+            BaseAgent._cache.record(hit=True)
+            return cached[1]
 
-    def get_open_prs(self) -> List[Dict]:
+        # A 304 Not Modified does not count against the rate limit
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        status, response_headers, body = await self._throttled(
+            "GET", url, params=params, headers=headers, **kwargs
+        )
+        BaseAgent._cache.record(hit=status == 304)
+        if status == 304:
+            body = cached[1]
+        if "ETag" in response_headers:
+            BaseAgent._cache.put_etag(key, response_headers["ETag"], body)
+        return body
+
+    async def get_file_contents(self, path: str, ref: Optional[str] = None) -> bytes:
+        """Get the decoded contents of a file in the repository."""
+        # Contents at a commit SHA never change, so they are kept until evicted
+        key = ("contents", self.repo_path, ref, path)
+        if is_sha(ref):
+            cached = BaseAgent._cache.get(key)
+            if cached is not None:
+                return cached
+        contents = await self._rest_async(
+            "GET",
+            f"{self.repo_path}/contents/{path}",
+            params={"ref": ref} if ref else None
+        )
+        decoded = base64.b64decode(contents["content"])
+        if is_sha(ref):
+            BaseAgent._cache.put(key, decoded)
+        return decoded
+
+    async def put_file(self, path: str, message: str, content: str, branch: str,
+                       sha: Optional[str] = None) -> Dict:
+        """Create a file on a branch, or update it when its current `sha` is given."""
+        payload = {
+            "message": message,
+            "content": base64.b64encode(content.encode()).decode(),
+            "branch": branch
+        }
+        if sha:
+            payload["sha"] = sha
+        return await self._rest_async("PUT", f"{self.repo_path}/contents/{path}", json=payload)
+
+    async def get_blob_texts(self, paths: List[str], ref: str) -> Dict[str, Optional[str]]:
+        """Get the text of several files at a ref in a single GraphQL query."""
+        texts: Dict[str, Optional[str]] = {}
+        if is_sha(ref):
+            # Blobs at a commit SHA are immutable; only query the ones not seen yet
+            for path in paths:
+                cached = BaseAgent._cache.get(("blob", self.repo_path, ref, path))
+                if cached is not None:
+                    texts[path] = cached
+            paths = [path for path in paths if path not in texts]
+        if not paths:
+            return texts
+        declarations = "".join(f", $f{i}: String!" for i in range(len(paths)))
+        fields = "\n".join(f"f{i}: object(expression: $f{i}) {{ ... on Blob {{ text }} }}"
+                           for i in range(len(paths)))
+        query = (f"query($owner: String!, $name: String!{declarations}) {{\n"
+                 f"  repository(owner: $owner, name: $name) {{\n{fields}\n  }}\n}}")
+        variables = {"owner": self.repo_owner, "name": self.repo_short_name}
+        variables.update({f"f{i}": f"{ref}:{path}" for i, path in enumerate(paths)})
+
+        repository = (await self._gql(query, variables))["repository"]
+        # Missing files and binary blobs come back without text
+        for i, path in enumerate(paths):
+            texts[path] = (repository[f"f{i}"] or {}).get("text")
+            if is_sha(ref) and texts[path] is not None:
+                BaseAgent._cache.put(("blob", self.repo_path, ref, path), texts[path])
+        return texts
+
+    async def _rest_paginated(self, path: str, params: Optional[Dict[str, Any]] = None) -> List:
+        """Collect every page of a REST list endpoint."""
+        items = []
+        page = 1
+        while True:
+            batch = await self._rest_async(
+                "GET", path, params={**(params or {}), "per_page": 100, "page": page}
+            )
+            items.extend(batch)
+            if len(batch) < 100:
+                return items
+            page += 1
+
+    async def list_pulls(self, state: str = "all") -> List[Dict]:
+        """List pull requests in the given state as raw REST payloads."""
+        return await self._rest_paginated(f"{self.repo_path}/pulls", {"state": state})
+
+    async def get_pull_files(self, pr_number: int) -> List[Dict]:
+        """Get the files changed by a pull request as raw REST payloads."""
+        return await self._rest_paginated(f"{self.repo_path}/pulls/{pr_number}/files")
+
+    async def get_pull_commits(self, pr_number: int) -> List[Dict]:
+        """Get the SHA and message of each commit in a pull request."""
+        commits = await self._rest_paginated(f"{self.repo_path}/pulls/{pr_number}/commits")
+        return [{"sha": commit["sha"], "message": commit["commit"]["message"]}
+                for commit in commits]
+
+    async def fetch_pr_snapshot(self, pr_number: int) -> PRSnapshot:
+        """Fetch a pull request with its commits, checks and reviews in one query."""
+        data = await self._gql(PR_SNAPSHOT_QUERY, self._pr_snapshot_variables(pr_number))
+        pr = data["repository"]["pullRequest"]
+
+        commits = [{"sha": node["commit"]["oid"], "message": node["commit"]["message"]}
+                   for node in pr["commits"]["nodes"]]
+        if pr["commits"]["pageInfo"]["hasNextPage"]:
+            # Rare enough that paging the REST listing beats paging the query
+            commits = await self.get_pull_commits(pr_number)
+
+        # The rollup holds only the latest run of each check, as shown in the UI
+        checks = []
+        for node in pr["lastCommit"]["nodes"]:
+            rollup = node["commit"]["statusCheckRollup"]
+            for context in (rollup["contexts"]["nodes"] if rollup else []):
+                # GraphQL reports conclusions and states as upper-case enums
+                conclusion = context.get("conclusion", context.get("state"))
+                checks.append({
+                    "name": context.get("name", context.get("context")),
+                    "conclusion": (conclusion or "").lower() or None
+                })
+
+        reviews = [{
+            "user": (review["author"] or {}).get("login"),
+            "state": review["state"]
+        } for review in pr["reviews"]["nodes"]]
+
+        return PRSnapshot(
+            number=pr["number"],
+            title=pr["title"],
+            body=pr["body"],
+            head_ref=pr["headRefName"],
+            head_sha=pr["headRefOid"],
+            base_sha=pr["baseRefOid"],
+            head_base_sha=(pr["baseRef"] or {}).get("target", {}).get("oid"),
+            commits=commits,
+            checks=checks,
+            reviews=reviews
+        )
+
+    def _pr_snapshot_variables(self, pr_number: int) -> Dict[str, Any]:
+        """Variables of the snapshot query for a pull request."""
+        return {"owner": self.repo_owner, "name": self.repo_short_name, "number": pr_number}
+
+    def _forget_pr_snapshot(self, pr_number: int) -> None:
+        """Stop sharing a PR's snapshot after changing it, so the next read sees the change."""
+        BaseAgent._coalescer.discard(
+            _gql_key(PR_SNAPSHOT_QUERY, self._pr_snapshot_variables(pr_number))
+        )
+
+    async def create_review(self, pr_number: int, body: str, event: str) -> Dict:
+        """Submit a review on a pull request."""
+        try:
+            return await self._rest_async("POST", f"{self.repo_path}/pulls/{pr_number}/reviews",
+                                          json={"body": body, "event": event})
+        finally:
+            self._forget_pr_snapshot(pr_number)
+
+    async def _gql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict:
+        """Execute a GraphQL query and return its `data` payload."""
+        variables = variables or {}
+        return await BaseAgent._coalescer.get(_gql_key(query, variables),
+                                              lambda: self._execute_gql(query, variables))
+
+    async def _execute_gql(self, query: str, variables: Dict[str, Any]) -> Dict:
+        """Send a GraphQL query to GitHub."""
+        _, _, payload = await self._throttled(
+            "POST",
+            GRAPHQL_URL,
+            json={"query": query, "variables": variables}
+        )
+        if payload.get("errors"):
+            messages = "; ".join(error.get("message", "") for error in payload["errors"])
+            raise RuntimeError(f"GraphQL query failed: {messages}")
+        return payload["data"]
+
+    async def get_open_prs(self) -> List[Dict]:
         """Get all open pull requests."""
         try:
-            prs = self.repo.get_pulls(state='open')
-            return [{
-                "number": pr.number,
-                "title": pr.title,
-                "body": pr.body,
-                "user": pr.user.login,
-                "url": pr.html_url,
-                "created_at": pr.created_at.isoformat()
-            } for pr in prs]
+            prs = []
+            cursor = None
+            while True:
+                data = await self._gql(OPEN_PRS_QUERY, {
+                    "owner": self.repo_owner,
+                    "name": self.repo_short_name,
+                    "cursor": cursor
+                })
+                page = data["repository"]["pullRequests"]
+                for node in page["nodes"]:
+                    prs.append({
+                        "number": node["number"],
+                        "title": node["title"],
+                        "body": node["body"],
+                        "user": (node["author"] or {}).get("login"),
+                        "url": node["url"],
+                        "created_at": datetime.fromisoformat(
+                            node["createdAt"].replace("Z", "+00:00")
+                        ).isoformat(),
+                        "reviewer_logins": {
+                            review["author"]["login"]
+                            for review in node["reviews"]["nodes"] if review["author"]
+                        }
+                    })
+                if not page["pageInfo"]["hasNextPage"]:
+                    return prs
+                cursor = page["pageInfo"]["endCursor"]
         except Exception as e:
-            self.logger.error(f"Failed to fetch PRs: {str(e)}")
+            self.logger.error("Failed to fetch PRs: %s", e)
             return []
 
-    def merge_pr(self, pr_number: int, commit_message: str) -> bool:
+    async def merge_pr(self, pr_number: int, commit_message: str) -> bool:
         """Merge a pull request."""
         try:
-            pr = self.repo.get_pull(pr_number)
-            pr.merge(commit_message=commit_message)
-            self.logger.info(f"Merged PR #{pr_number}")
+            await self._rest_async("PUT", f"{self.repo_path}/pulls/{pr_number}/merge",
+                                   json={"commit_message": commit_message})
+            self.logger.info("Merged PR #%s", pr_number)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to merge PR #{pr_number}: {str(e)}")
+            self.logger.error("Failed to merge PR #%s: %s", pr_number, e)
             return False
+        finally:
+            self._forget_pr_snapshot(pr_number)
 
-    def create_branch(self, branch_name: str, from_branch: str = "main") -> bool:
+    async def create_branch(self, branch_name: str, from_branch: str = "main") -> bool:
         """Create a new branch from the specified base branch."""
         try:
-            base = self.repo.get_branch(from_branch)
-            self.repo.create_git_ref(
-                ref=f"refs/heads/{branch_name}",
-                sha=base.commit.sha
+            base = await self._rest_async("GET", f"{self.repo_path}/git/ref/heads/{from_branch}")
+            await self._rest_async("POST", f"{self.repo_path}/git/refs", json={
+                "ref": f"refs/heads/{branch_name}",
+                "sha": base["object"]["sha"]
+            })
+            self.logger.info("Created branch: %s", branch_name)
+            return True
+        except Exception as e:
+            self.logger.error("Failed to create branch %s: %s", branch_name, e)
+            return False
+
+    async def commit_files(self, branch_name: str, files: Dict[str, str], message: str) -> bool:
+        """Commit several files to a branch as a single commit."""
+        try:
+            # Read the ref uncached: it is about to be moved
+            _, _, ref = await self._throttled(
+                "GET", f"{REST_URL}{self.repo_path}/git/ref/heads/{branch_name}",
+                token=self._tokens[0]
             )
-            self.logger.info(f"Created branch: {branch_name}")
+            parent_sha = ref["object"]["sha"]
+            base_commit = await self._rest_async("GET", f"{self.repo_path}/git/commits/{parent_sha}")
+
+            blobs = await asyncio.gather(*(
+                self._rest_async("POST", f"{self.repo_path}/git/blobs", json={
+                    "content": base64.b64encode(content.encode()).decode(),
+                    "encoding": "base64"
+                })
+                for content in files.values()
+            ))
+            tree = await self._rest_async("POST", f"{self.repo_path}/git/trees", json={
+                "base_tree": base_commit["tree"]["sha"],
+                "tree": [{"path": path, "mode": "100644", "type": "blob", "sha": blob["sha"]}
+                         for path, blob in zip(files, blobs)]
+            })
+            commit = await self._rest_async("POST", f"{self.repo_path}/git/commits", json={
+                "message": message,
+                "tree": tree["sha"],
+                "parents": [parent_sha]
+            })
+            await self._rest_async("PATCH", f"{self.repo_path}/git/refs/heads/{branch_name}",
+                                   json={"sha": commit["sha"]})
+            self.logger.info("Committed %s files to %s", len(files), branch_name)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to create branch {branch_name}: {str(e)}")
+            self.logger.error("Failed to commit files to %s: %s", branch_name, e)
             return False
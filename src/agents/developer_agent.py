@@ -1,6 +1,10 @@
 from typing import Dict, Optional
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
 from datetime import datetime
 from .base_agent import BaseAgent
 
@@ -14,7 +18,7 @@ class DeveloperAgent(BaseAgent):
     async def process(self) -> None:
         """Process specifications and implement features."""
         # Get current specifications
-        specs = self.get_specifications()
+        specs = await self.get_specifications()
         if not specs:
             self.logger.info("No specifications found to implement")
             return
@@ -24,13 +28,13 @@ class DeveloperAgent(BaseAgent):
             if feature["status"] == "pending":
                 await self.implement_feature(feature)
 
-    def get_specifications(self) -> Optional[Dict]:
+    async def get_specifications(self) -> Optional[Dict]:
         """Get current project specifications."""
         try:
-            specs_file = self.repo.get_contents("specifications/current.yaml")
-            return yaml.safe_load(specs_file.decoded_content)
+            specs_content = await self.get_file_contents("specifications/current.yaml")
+            return yaml.load(specs_content, Loader=_Loader)
         except Exception as e:
-            self.logger.error(f"Failed to get specifications: {str(e)}")
+            self.logger.error("Failed to get specifications: %s", e)
             return None
 
     async def implement_feature(self, feature: Dict) -> None:
@@ -38,7 +42,7 @@ class DeveloperAgent(BaseAgent):
         feature_id = feature["id"]
         branch_name = f"feat/{feature_id}"
 
-        if self.create_branch(branch_name):
+        if await self.create_branch(branch_name):
             try:
                 # Create implementation files based on feature requirements
                 if feature_id == "user-auth":
@@ -46,10 +50,12 @@ class DeveloperAgent(BaseAgent):
                 # Add more feature implementations as needed
 
             except Exception as e:
-                self.logger.error(f"Failed to implement feature {feature_id}: {str(e)}")
+                self.logger.error("Failed to implement feature %s: %s", feature_id, e)
 
     async def implement_user_auth(self, branch_name: str) -> None:
         """Implement user authentication feature."""
+        feature_id = "user-auth"
+
         # Create necessary files for user authentication
         files_to_create = {
             "src/auth/user.py": self.get_user_model_code(),
@@ -58,17 +64,8 @@ class DeveloperAgent(BaseAgent):
             "tests/auth/test_user_auth.py": self.get_auth_tests_code()
         }
 
-        for file_path, content in files_to_create.items():
-            try:
-                self.repo.create_file(
-                    file_path,
-                    f"Add {file_path}",
-                    content,
-                    branch=branch_name
-                )
-            except Exception as e:
-                self.logger.error(f"Failed to create {file_path}: {str(e)}")
-                return
+        if not await self.commit_files(branch_name, files_to_create, "Add user authentication files"):
+            return
 
         # Create pull request for the implementation
         pr_body = f"""
@@ -93,7 +90,7 @@ class DeveloperAgent(BaseAgent):
         Closes #{feature_id}
         """
 
-        self.create_pull_request(
+        await self.create_pull_request(
             branch=branch_name,
             title=f"feat: {feature_id} - Implement User Authentication",
             body=pr_body
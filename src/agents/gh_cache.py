@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import re
+import time
+
+_SHA_RE = re.compile(r'^[0-9a-f]{40}$')
+
+
+def is_sha(ref: Optional[str]) -> bool:
+    """Check if a ref is a full commit SHA, whose content can never change."""
+    return bool(ref and _SHA_RE.match(ref))
+
+
+class ShaCache:
+    """Caches GitHub reads: immutable content keyed by SHA, mutable responses by ETag."""
+
+    def __init__(self, maxsize: int = 1024, etag_maxsize: int = 256, ttl: float = 30):
+        self.maxsize = maxsize
+        self.etag_maxsize = etag_maxsize
+        self.ttl = ttl
+        # Both least recently used first
+        self._immutable: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # key -> (ETag, parsed body, time stored)
+        self._etags: "OrderedDict[Hashable, Tuple[str, Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the immutable value stored under `key`, or None."""
+        if key not in self._immutable:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._immutable.move_to_end(key)
+        return self._immutable[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store an immutable value."""
+        self._immutable[key] = value
+        self._immutable.move_to_end(key)
+        while len(self._immutable) > self.maxsize:
+            self._immutable.popitem(last=False)
+
+    def get_etag(self, key: Hashable) -> Optional[Tuple[str, Any, float]]:
+        """Return the stored (ETag, body, time stored) entry for `key`, or None."""
+        entry = self._etags.get(key)
+        if entry is not None:
+            self._etags.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: Tuple[str, Any, float]) -> bool:
+        """Check if an ETag entry can be served without revalidating it."""
+        return time.monotonic() - entry[2] < self.ttl
+
+    def put_etag(self, key: Hashable, etag: str, body: Any) -> None:
+        """Store a response body with the ETag that validates it."""
+        self._etags[key] = (etag, body, time.monotonic())
+        self._etags.move_to_end(key)
+        while len(self._etags) > self.etag_maxsize:
+            self._etags.popitem(last=False)
+
+    def record(self, hit: bool) -> None:
+        """Count a lookup resolved outside `get`, such as an ETag revalidation."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def take_stats(self) -> Tuple[int, int]:
+        """Return the hit and miss counts since the last call, and reset them."""
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return stats
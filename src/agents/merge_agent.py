@@ -1,6 +1,6 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, PRSnapshot
 
 class MergeAgent(BaseAgent):
     """Agent responsible for making final decisions on merging pull requests."""
@@ -11,39 +11,45 @@ class MergeAgent(BaseAgent):
 
     async def process(self) -> None:
         """Process pull requests and make merge decisions."""
-        open_prs = self.get_open_prs()
-        for pr in open_prs:
-            await self.evaluate_pr_for_merge(pr)
+        open_prs = await self.get_open_prs()
+        await self._process_concurrently(self.evaluate_pr_for_merge, open_prs)
 
     async def evaluate_pr_for_merge(self, pr: Dict) -> None:
         """Evaluate a pull request for merging."""
+        async with self._sem:
+            await self._evaluate_pr_for_merge(pr)
+
+    async def _evaluate_pr_for_merge(self, pr: Dict) -> None:
         pr_number = pr["number"]
-        github_pr = self.repo.get_pull(pr_number)
+        snapshot = await self.fetch_pr_snapshot(pr_number)
 
         # Skip if PR is not approved or has pending reviews
-        if not self.is_pr_approved(github_pr):
+        if not self.is_pr_approved(snapshot.reviews):
             return
 
         # Check merge criteria
-        merge_status = await self.check_merge_criteria(github_pr)
+        merge_status = await self.check_merge_criteria(snapshot)
         
         if merge_status["can_merge"]:
             # Merge the PR
-            commit_message = self.generate_merge_commit_message(github_pr, merge_status)
-            self.merge_pr(pr_number, commit_message)
+            commit_message = self.generate_merge_commit_message(snapshot, merge_status)
+            await self.merge_pr(pr_number, commit_message)
+        elif self._limiter_for(self._tokens[0], "core").is_depleted():
+            # Explaining a blocked merge can wait until the REST budget the
+            # comment is written from (the primary token's) resets
+            self.logger.info("Rate limit low, skipping blocking comment on PR #%s", pr_number)
         else:
             # Comment on why PR cannot be merged
             comment = self.generate_blocking_comment(merge_status)
-            self.comment_on_pr(pr_number, comment)
+            await self.comment_on_pr(pr_number, comment)
 
-    def is_pr_approved(self, pr) -> bool:
+    def is_pr_approved(self, reviews: List[Dict]) -> bool:
         """Check if PR has necessary approvals."""
-        reviews = pr.get_reviews()
         latest_reviews = {}
         
         # Get latest review from each reviewer
         for review in reviews:
-            latest_reviews[review.user.login] = review.state
+            latest_reviews[review["user"]] = review["state"]
 
         # Count approvals
         approvals = sum(1 for state in latest_reviews.values() 
@@ -53,7 +59,7 @@ class MergeAgent(BaseAgent):
         return (approvals >= 1 and 
                 "CHANGES_REQUESTED" not in latest_reviews.values())
 
-    async def check_merge_criteria(self, pr) -> Dict:
+    async def check_merge_criteria(self, snapshot: PRSnapshot) -> Dict:
         """Check various criteria for merging."""
         status = {
             "can_merge": True,
@@ -65,8 +71,8 @@ class MergeAgent(BaseAgent):
         }
 
         # Check if CI checks are passing
-        checks = pr.get_commits().reversed[0].get_check_runs()
-        status["checks_passed"] = all(check.conclusion == "success" 
+        checks = snapshot.checks
+        status["checks_passed"] = all(check["conclusion"] == "success" 
                                     for check in checks)
         if not status["checks_passed"]:
             status["blocking_issues"].append("CI checks must pass")
@@ -74,15 +80,14 @@ class MergeAgent(BaseAgent):
 
         # Check if tests are passing
         test_check = next((check for check in checks 
-                          if check.name.lower().startswith("test")), None)
-        status["tests_passed"] = test_check and test_check.conclusion == "success"
+                          if check["name"].lower().startswith("test")), None)
+        status["tests_passed"] = bool(test_check) and test_check["conclusion"] == "success"
         if not status["tests_passed"]:
             status["blocking_issues"].append("All tests must pass")
             status["can_merge"] = False
 
         # Check review requirements
-        reviews = pr.get_reviews()
-        review_states = [review.state for review in reviews]
+        review_states = [review["state"] for review in snapshot.reviews]
         status["review_requirements_met"] = (
             review_states.count("APPROVED") >= 1 and
             "CHANGES_REQUESTED" not in review_states
@@ -92,18 +97,17 @@ class MergeAgent(BaseAgent):
             status["can_merge"] = False
 
         # Check if branch is up to date
-        base = pr.base.repo.get_branch(pr.base.ref)
-        status["branch_up_to_date"] = pr.base.sha == base.commit.sha
+        status["branch_up_to_date"] = snapshot.base_sha == snapshot.head_base_sha
         if not status["branch_up_to_date"]:
             status["blocking_issues"].append("Branch must be up to date with base")
             status["can_merge"] = False
 
         return status
 
-    def generate_merge_commit_message(self, pr, merge_status: Dict) -> str:
+    def generate_merge_commit_message(self, pr: PRSnapshot, merge_status: Dict) -> str:
         """Generate a detailed merge commit message."""
         message_parts = [
-            f"Merge pull request #{pr.number} from {pr.head.ref}",
+            f"Merge pull request #{pr.number} from {pr.head_ref}",
             "",
             pr.title,
             "",
@@ -117,15 +121,10 @@ class MergeAgent(BaseAgent):
             pr.body or "No description provided.",
             "",
             "# Reviews",
+            # Add review information
+            *(f"- {review['user']}: {review['state']}" for review in pr.reviews)
         ]
 
-        # Add review information
-        reviews = pr.get_reviews()
-        for review in reviews:
-            message_parts.append(
-                f"- {review.user.login}: {review.state}"
-            )
-
         return "\n".join(message_parts)
 
     def generate_blocking_comment(self, merge_status: Dict) -> str:
@@ -134,15 +133,10 @@ class MergeAgent(BaseAgent):
             "# 🚫 Cannot Merge Pull Request",
             "",
             "The following criteria must be met before merging:",
-            ""
-        ]
-
-        for issue in merge_status["blocking_issues"]:
-            comment_parts.append(f"- ❌ {issue}")
-
-        comment_parts.extend([
+            "",
+            *(f"- ❌ {issue}" for issue in merge_status["blocking_issues"]),
             "",
             "Please address these issues and request a new review."
-        ])
+        ]
 
         return "\n".join(comment_parts)
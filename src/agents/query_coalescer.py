@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+import asyncio
+import time
+
+class QueryCoalescer:
+    """Shares one in-flight or recent result between callers issuing the same query."""
+
+    def __init__(self, ttl: float = 5.0, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key -> (future, time started), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[asyncio.Future, float]]" = OrderedDict()
+
+    async def get(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the shared result for `key`, calling `factory` only on a miss."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and self._is_fresh(entry, now):
+            self._entries.move_to_end(key)
+            return await asyncio.shield(entry[0])
+
+        future = asyncio.ensure_future(factory())
+        self._entries[key] = (future, now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Failures are shared with concurrent callers but never cached
+            if self._entries.get(key, (None,))[0] is future:
+                del self._entries[key]
+            raise
+
+    def discard(self, key: Hashable) -> None:
+        """Forget the result for `key`, so the next caller runs the query again."""
+        self._entries.pop(key, None)
+
+    def _is_fresh(self, entry: Tuple[asyncio.Future, float], now: float) -> bool:
+        """Check if an entry can be shared: still running, or finished within the TTL."""
+        future, started = entry
+        if future.get_loop() is not asyncio.get_running_loop():
+            return False
+        return not future.done() or now - started < self.ttl
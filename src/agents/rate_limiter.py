@@ -0,0 +1,52 @@
+from typing import Optional, Mapping
+import asyncio
+import random
+import time
+
+class RateLimiter:
+    """Tracks GitHub rate-limit headers and delays requests when the budget runs low."""
+
+    def __init__(self, threshold: int = 100, max_retries: int = 6, max_backoff: float = 60):
+        self.threshold = threshold
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Record the rate-limit state reported by a response."""
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset" in headers:
+            self.reset = float(headers["X-RateLimit-Reset"])
+
+    def is_depleted(self) -> bool:
+        """Check if the remaining budget is below the threshold until the next reset."""
+        return (self.remaining is not None and self.remaining < self.threshold and
+                self.reset is not None and self.reset > time.time())
+
+    async def wait(self) -> None:
+        """Sleep until the rate limit resets if the budget is nearly exhausted."""
+        if self.is_depleted():
+            await asyncio.sleep(self.reset - time.time())
+
+    def retry_delay(self, status: int, headers: Mapping[str, str], body: str,
+                    attempt: int) -> Optional[float]:
+        """Return how long to wait before retrying a throttled response, if at all."""
+        if status not in (403, 429) or attempt >= self.max_retries:
+            return None
+
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            return float(retry_after)
+
+        if status == 429 or "secondary rate limit" in body.lower():
+            # Jitter keeps concurrent requests from retrying in lockstep
+            backoff = min(2 ** attempt, self.max_backoff)
+            return backoff / 2 + random.uniform(0, backoff / 2)
+
+        # Primary limit exhausted: wait for the reset window
+        if headers.get("X-RateLimit-Remaining") == "0" and self.reset is not None:
+            return max(self.reset - time.time(), 0)
+
+        return None
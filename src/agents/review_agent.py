@@ -2,6 +2,16 @@ from typing import List, Dict, Set
 import re
 from .base_agent import BaseAgent
 
+# Matched against the whole message; `.` stops at the end of the subject line
+_CONVENTIONAL_COMMIT = re.compile(
+    r'^(feat|fix|docs|style|refactor|perf|test|chore|build|ci|revert)(\([^)]+\))?!?: .+'
+)
+_TEST_FUNC = re.compile(r'def test_\w+')
+# Substrings check_code looks for, matched in a single scan of each patch
+_CODE_SMELLS = re.compile('|'.join(map(re.escape, ('import *', 'def ', 'class ', '"""', 'except:'))))
+# An added line longer than 88 characters, counting the leading '+'
+_LONG_LINE = re.compile(r'^\+.{88}', re.MULTILINE)
+
 class ReviewAgent(BaseAgent):
     """Agent responsible for reviewing pull requests and providing feedback."""
 
@@ -11,118 +21,123 @@ class ReviewAgent(BaseAgent):
 
     async def process(self) -> None:
         """Process open pull requests and provide reviews."""
-        open_prs = self.get_open_prs()
-        for pr in open_prs:
-            await self.review_pull_request(pr)
+        open_prs = await self.filter_unreviewed(await self.get_open_prs())
+        await self._process_concurrently(self.review_pull_request, open_prs)
+
+    async def filter_unreviewed(self, prs: List[Dict]) -> List[Dict]:
+        """Drop PRs this agent has already reviewed, before fetching anything else."""
+        bot_login = await self.get_bot_login()
+        return [pr for pr in prs if bot_login not in pr["reviewer_logins"]]
 
     async def review_pull_request(self, pr: Dict) -> None:
         """Review a specific pull request and provide feedback."""
+        async with self._sem:
+            await self._review_pull_request(pr)
+
+    async def _review_pull_request(self, pr: Dict) -> None:
         pr_number = pr["number"]
         
-        # Get PR details from GitHub
-        github_pr = self.repo.get_pull(pr_number)
-        
-        # Skip if PR has already been reviewed by this agent
-        if self.has_reviewed_pr(github_pr):
-            return
+        # Get PR details and commits from GitHub in one query
+        snapshot = await self.fetch_pr_snapshot(pr_number)
 
         # Perform various checks
         review_comments = []
         
         # Check commit messages
-        commit_issues = self.check_commit_messages(github_pr)
+        commit_issues = self.check_commit_messages(snapshot.commits)
         if commit_issues:
             review_comments.extend(commit_issues)
 
+        # Fetch changed files once for all file-based checks
+        files = await self.get_pull_files(pr_number)
+
         # Check code style and patterns
-        code_issues = await self.check_code(github_pr)
+        code_issues = await self.check_code(files)
         if code_issues:
             review_comments.extend(code_issues)
 
         # Check tests
-        test_issues = await self.check_tests(github_pr)
+        test_issues = await self.check_tests(files, snapshot.head_sha)
         if test_issues:
             review_comments.extend(test_issues)
 
         # Submit review
         if review_comments:
             review_body = "## Code Review Feedback\n\n" + "\n".join(review_comments)
-            github_pr.create_review(
+            await self.create_review(
+                pr_number,
                 body=review_body,
                 event="REQUEST_CHANGES" if any(self.is_blocking_issue(c) for c in review_comments) else "COMMENT"
             )
         else:
-            github_pr.create_review(
+            await self.create_review(
+                pr_number,
                 body="Code looks good! All checks passed.",
                 event="APPROVE"
             )
 
-    def has_reviewed_pr(self, pr) -> bool:
-        """Check if this agent has already reviewed the PR."""
-        reviews = pr.get_reviews()
-        bot_username = self.github.get_user().login
-        return any(review.user.login == bot_username for review in reviews)
-
-    def check_commit_messages(self, pr) -> List[str]:
+    def check_commit_messages(self, commits: List[Dict]) -> List[str]:
         """Check commit message formatting and content."""
         issues = []
-        commits = pr.get_commits()
         
         for commit in commits:
-            msg = commit.commit.message
+            msg = commit["message"]
             
             # Check conventional commit format
-            if not re.match(r'^(feat|fix|docs|style|refactor|test|chore)(\(.+\))?: .+', msg):
-                issues.append(f"❌ Commit `{commit.sha[:7]}` doesn't follow conventional commit format")
+            if not _CONVENTIONAL_COMMIT.match(msg):
+                issues.append(f"❌ Commit `{commit['sha'][:7]}` doesn't follow conventional commit format")
             
             # Check message length
-            if len(msg.split('\n')[0]) > 72:
-                issues.append(f"❌ Commit `{commit.sha[:7]}` has too long subject line (>72 chars)")
+            subject_len = msg.find('\n')
+            if (subject_len if subject_len >= 0 else len(msg)) > 72:
+                issues.append(f"❌ Commit `{commit['sha'][:7]}` has too long subject line (>72 chars)")
 
         return issues
 
-    async def check_code(self, pr) -> List[str]:
+    async def check_code(self, files: List[Dict]) -> List[str]:
         """Check code style, patterns, and potential issues."""
         issues = []
-        files = pr.get_files()
         
         for file in files:
-            if file.filename.endswith('.py'):
+            filename = file["filename"]
+            # Binary and very large diffs come without a patch
+            patch = file.get("patch") or ""
+            if filename.endswith('.py'):
+                found = set(_CODE_SMELLS.findall(patch))
+
                 # Check Python imports
-                if 'import *' in file.patch:
-                    issues.append(f"⚠️ Avoid using wildcard imports in `{file.filename}`")
+                if 'import *' in found:
+                    issues.append(f"⚠️ Avoid using wildcard imports in `{filename}`")
                 
                 # Check function/class documentation
-                if 'def ' in file.patch or 'class ' in file.patch:
-                    if '"""' not in file.patch:
-                        issues.append(f"⚠️ Missing docstrings in `{file.filename}`")
+                if 'def ' in found or 'class ' in found:
+                    if '"""' not in found:
+                        issues.append(f"⚠️ Missing docstrings in `{filename}`")
                 
                 # Check line length
-                long_lines = [line for line in file.patch.split('\n') 
-                            if line.startswith('+') and len(line) > 88]
-                if long_lines:
-                    issues.append(f"⚠️ Lines too long in `{file.filename}` (>88 chars)")
+                if _LONG_LINE.search(patch):
+                    issues.append(f"⚠️ Lines too long in `{filename}` (>88 chars)")
 
                 # Check error handling
-                if 'except:' in file.patch:
-                    issues.append(f"❌ Bare except clause found in `{file.filename}`. Please specify exception types.")
+                if 'except:' in found:
+                    issues.append(f"❌ Bare except clause found in `{filename}`. Please specify exception types.")
 
         return issues
 
-    async def check_tests(self, pr) -> List[str]:
+    async def check_tests(self, files: List[Dict], head_sha: str) -> List[str]:
         """Check test coverage and quality."""
         issues = []
-        files = pr.get_files()
         
         # Track which source files have corresponding test files
         source_files: Set[str] = set()
         test_files: Set[str] = set()
         
         for file in files:
-            if file.filename.startswith('src/') and file.filename.endswith('.py'):
-                source_files.add(file.filename)
-            elif file.filename.startswith('tests/') and file.filename.endswith('.py'):
-                test_files.add(file.filename)
+            filename = file["filename"]
+            if filename.startswith('src/') and filename.endswith('.py'):
+                source_files.add(filename)
+            elif filename.startswith('tests/') and filename.endswith('.py'):
+                test_files.add(filename)
 
         # Check for missing test files
         for source_file in source_files:
@@ -131,15 +146,18 @@ class ReviewAgent(BaseAgent):
                 issues.append(f"❌ Missing tests for `{source_file}`")
 
         # Check test quality
-        for test_file in test_files:
-            content = self.repo.get_contents(test_file, ref=pr.head.sha).decoded_content.decode()
+        test_contents = await self.get_blob_texts(sorted(test_files), head_sha)
+        for test_file, content in test_contents.items():
+            # Skip test files deleted by the PR
+            if content is None:
+                continue
             
             # Check for assert statements
             if 'assert' not in content:
                 issues.append(f"❌ No assertions found in `{test_file}`")
             
             # Check for test function naming
-            if not re.search(r'def test_\w+', content):
+            if not _TEST_FUNC.search(content):
                 issues.append(f"⚠️ Test functions in `{test_file}` should start with 'test_'")
             
             # Check for pytest fixtures usage
@@ -1,9 +1,16 @@
 from typing import List, Dict
 import os
+import re
 import yaml
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
 from datetime import datetime
 from .base_agent import BaseAgent
 
+_FEAT_RE = re.compile(r'^feat:\s*(\S+)')
+
 class SpecificationAgent(BaseAgent):
     """Agent responsible for creating and maintaining project specifications."""
 
@@ -14,7 +21,7 @@ class SpecificationAgent(BaseAgent):
     async def process(self) -> None:
         """Process specifications and create/update them as needed."""
         # Check existing specifications
-        specs = self.get_current_specifications()
+        specs = await self.get_current_specifications()
         
         # Create or update specifications based on project needs
         if not specs:
@@ -22,11 +29,11 @@ class SpecificationAgent(BaseAgent):
         else:
             await self.review_and_update_specifications(specs)
 
-    def get_current_specifications(self) -> List[Dict]:
+    async def get_current_specifications(self) -> List[Dict]:
         """Retrieve current specifications from the repository."""
         try:
-            specs_file = self.repo.get_contents("specifications/current.yaml")
-            return yaml.safe_load(specs_file.decoded_content)
+            specs_content = await self.get_file_contents("specifications/current.yaml")
+            return yaml.load(specs_content, Loader=_Loader)
         except:
             return []
 
@@ -65,11 +72,11 @@ class SpecificationAgent(BaseAgent):
 
         # Create a new branch for specifications
         branch_name = f"specs/initial-specifications"
-        if self.create_branch(branch_name):
+        if await self.create_branch(branch_name):
             try:
                 # Create specifications directory and file
-                specs_yaml = yaml.dump(initial_specs, default_flow_style=False)
-                self.repo.create_file(
+                specs_yaml = yaml.dump(initial_specs, default_flow_style=False, Dumper=_Dumper)
+                await self.put_file(
                     "specifications/current.yaml",
                     "Initial project specifications",
                     specs_yaml,
@@ -88,49 +95,45 @@ class SpecificationAgent(BaseAgent):
                 Please review the specifications and provide feedback.
                 """
 
-                self.create_pull_request(
+                await self.create_pull_request(
                     branch=branch_name,
                     title="Initial Project Specifications",
                     body=pr_body
                 )
 
             except Exception as e:
-                self.logger.error(f"Failed to create specifications: {str(e)}")
+                self.logger.error("Failed to create specifications: %s", e)
 
     async def review_and_update_specifications(self, current_specs: List[Dict]) -> None:
         """Review and update existing specifications based on project progress."""
         # Check for completed features
         updated = False
+        prs_by_feature = await self.get_feature_prs()
         for feature in current_specs["features"]:
             if feature["status"] == "pending":
                 # Check if feature implementation PR exists
-                prs = self.repo.get_pulls(state='all')
-                for pr in prs:
-                    if pr.title.lower().startswith(f"feat: {feature['id']}"):
-                        if pr.merged:
-                            feature["status"] = "completed"
-                            updated = True
-                            break
-                        elif pr.state == "open":
-                            feature["status"] = "in-progress"
-                            updated = True
-                            break
+                pr = prs_by_feature.get(feature["id"])
+                if pr:
+                    feature["status"] = "completed" if pr["merged_at"] else "in-progress"
+                    updated = True
 
         if updated:
             branch_name = f"specs/update-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
-            if self.create_branch(branch_name):
+            if await self.create_branch(branch_name):
                 try:
                     current_specs["last_updated"] = datetime.utcnow().isoformat()
-                    specs_yaml = yaml.dump(current_specs, default_flow_style=False)
+                    specs_yaml = yaml.dump(current_specs, default_flow_style=False, Dumper=_Dumper)
                     
                     # Update specifications file
-                    specs_file = self.repo.get_contents("specifications/current.yaml")
-                    self.repo.update_file(
-                        specs_file.path,
+                    specs_file = await self._rest_async(
+                        "GET", f"{self.repo_path}/contents/specifications/current.yaml"
+                    )
+                    await self.put_file(
+                        specs_file["path"],
                         "Update specifications status",
                         specs_yaml,
-                        specs_file.sha,
-                        branch=branch_name
+                        branch=branch_name,
+                        sha=specs_file["sha"]
                     )
 
                     # Create pull request
@@ -140,11 +143,21 @@ class SpecificationAgent(BaseAgent):
                     This PR updates the status of features based on implementation progress.
                     """
 
-                    self.create_pull_request(
+                    await self.create_pull_request(
                         branch=branch_name,
                         title="Update Specification Status",
                         body=pr_body
                     )
 
                 except Exception as e:
-                    self.logger.error(f"Failed to update specifications: {str(e)}")
+                    self.logger.error("Failed to update specifications: %s", e)
+
+    async def get_feature_prs(self) -> Dict[str, Dict]:
+        """Map feature ids to their merged or open implementation PR."""
+        prs_by_feature = {}
+        for pr in await self.list_pulls(state='all'):
+            match = _FEAT_RE.match(pr["title"].lower())
+            # Closed, unmerged PRs don't change a feature's status
+            if match and (pr["merged_at"] or pr["state"] == "open"):
+                prs_by_feature.setdefault(match.group(1), pr)
+        return prs_by_feature
@@ -1,8 +1,13 @@
 import asyncio
 import os
 import logging
+import signal
+import time
 from dotenv import load_dotenv
-from typing import List
+from functools import cache, cached_property
+from pathlib import Path
+from typing import Dict, Optional, Type
+import aiohttp
 from agents.base_agent import BaseAgent
 from agents.specification_agent import SpecificationAgent
 from agents.developer_agent import DeveloperAgent
@@ -16,69 +21,207 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@cache
+def _load_env() -> bool:
+    """Load the .env file once per process."""
+    return load_dotenv()
+
+_load_env()
+
+# The tracked example at the repository root is the template for new copies
+ENV_EXAMPLE = Path(__file__).resolve().parent.parent / ".env.example"
+
+def _write_env_example() -> None:
+    """Create an example .env file unless one already exists."""
+    try:
+        # Read first, so a missing template does not leave an empty example behind
+        template = ENV_EXAMPLE.read_text()
+        with open(".env.example", "x") as f:
+            f.write(template)
+    except FileExistsError:
+        return
+    except OSError as e:
+        logger.warning("Could not create .env.example: %s", e)
+        return
+    logger.info("Created .env.example file. Please configure with your GitHub credentials.")
+
 class AgentOrchestrator:
     """Coordinates the execution of all agents in the system."""
 
     def __init__(self):
-        # Load environment variables
-        load_dotenv()
-        
         # Get GitHub configuration
-        self.github_token = os.getenv('GITHUB_TOKEN')
+        # GITHUB_TOKEN may hold several comma-separated tokens to rotate through
+        self.github_tokens = [token.strip() for token in os.getenv('GITHUB_TOKEN', '').split(',')
+                              if token.strip()]
         self.repo_name = os.getenv('GITHUB_REPO')
         
-        if not self.github_token or not self.repo_name:
+        if not self.github_tokens or not self.repo_name:
+            _write_env_example()
             raise ValueError("GitHub token and repository name must be configured")
 
-        # Initialize agents
-        self.agents: List[BaseAgent] = [
-            SpecificationAgent(self.github_token, self.repo_name),
-            DeveloperAgent(self.github_token, self.repo_name),
-            ReviewAgent(self.github_token, self.repo_name),
-            MergeAgent(self.github_token, self.repo_name)
-        ]
+        # Set by SIGINT/SIGTERM to end `run`
+        self._stop = asyncio.Event()
+
+        # One connection pool and one in-flight request limit shared by every agent.
+        # The pool needs a running event loop, so it is opened on first use.
+        self._http: Optional[aiohttp.ClientSession] = None
+        self.gh_sem = asyncio.Semaphore(int(os.getenv("GH_MAX_CONCURRENCY", "8")))
+
+    # Agents are built on first use, so roles that never run are never constructed
+    @cached_property
+    def specification_agent(self) -> SpecificationAgent:
+        return self._make_agent(SpecificationAgent)
+
+    @cached_property
+    def developer_agent(self) -> DeveloperAgent:
+        return self._make_agent(DeveloperAgent)
+
+    @cached_property
+    def review_agent(self) -> ReviewAgent:
+        return self._make_agent(ReviewAgent)
+
+    @cached_property
+    def merge_agent(self) -> MergeAgent:
+        return self._make_agent(MergeAgent)
+
+    @property
+    def http(self) -> aiohttp.ClientSession:
+        """The HTTP session shared by the agents, opened on first use."""
+        if self._http is None:
+            self._http = BaseAgent.create_session()
+        return self._http
+
+    def _make_agent(self, agent_class: Type[BaseAgent]) -> BaseAgent:
+        """Create an agent sharing the orchestrator's session and request limit."""
+        return agent_class(self.github_tokens, self.repo_name, http=self.http, gh_sem=self.gh_sem)
+
+    async def aclose(self) -> None:
+        """Close the HTTP session shared by the agents, if it was opened."""
+        if self._http is not None:
+            await self._http.close()
 
     async def run_agent_cycle(self) -> None:
-        """Run one cycle of all agents."""
-        for agent in self.agents:
+        """Run one cycle: specification and development alongside the pull request pipeline."""
+        await asyncio.gather(
+            self._run_one(self.specification_agent),
+            self._run_one(self.developer_agent),
+            self._run_pr_pipeline()
+        )
+        hits, misses = BaseAgent._cache.take_stats()
+        logger.info("GitHub cache: %s hits, %s misses this cycle", hits, misses)
+
+    async def _run_one(self, agent: BaseAgent) -> None:
+        """Run one agent's cycle, logging failures so other agents keep running."""
+        role = agent.role
+        try:
+            logger.info("Starting %s processing cycle", role)
+            await agent.process()
+            logger.info("Completed %s processing cycle", role)
+        except Exception as e:
+            logger.error("Error in %s: %s", role, e)
+
+    async def _run_pr_pipeline(self) -> None:
+        """Fetch the open PRs once and take each one through review, then merge."""
+        try:
+            logger.info("Starting pull request pipeline")
+            open_prs = await self.review_agent.get_open_prs()
+            to_review = {pr["number"] for pr in await self.review_agent.filter_unreviewed(open_prs)}
+            results = await asyncio.gather(
+                *(self._process_pr(pr, pr["number"] in to_review) for pr in open_prs),
+                return_exceptions=True
+            )
+            for pr, result in zip(open_prs, results):
+                if isinstance(result, Exception):
+                    logger.error("Failed to process PR #%s: %s", pr["number"], result)
+            logger.info("Completed pull request pipeline")
+        except Exception as e:
+            logger.error("Error in pull request pipeline: %s", e)
+
+    async def _process_pr(self, pr: Dict, review: bool) -> None:
+        """Review a PR if it still needs it, then evaluate it for merging."""
+        if review:
             try:
-                logger.info(f"Starting {agent.role} processing cycle")
-                await agent.process()
-                logger.info(f"Completed {agent.role} processing cycle")
+                await self.review_agent.review_pull_request(pr)
             except Exception as e:
-                logger.error(f"Error in {agent.role}: {str(e)}")
+                # A failed review must not hold back a PR that is otherwise mergeable
+                logger.error("Failed to review PR #%s: %s", pr["number"], e)
+        await self.merge_agent.evaluate_pr_for_merge(pr)
+
+    def stop(self) -> None:
+        """Ask `run` to cancel the current cycle and return."""
+        self._stop.set()
 
     async def run(self, interval_seconds: int = 300) -> None:
-        """Run the orchestrator continuously."""
+        """Run the orchestrator until stopped by SIGINT/SIGTERM or `stop`."""
         logger.info("Starting Agent Orchestrator")
-        
-        while True:
+        loop = asyncio.get_running_loop()
+        signals = (signal.SIGINT, signal.SIGTERM)
+        for sig in signals:
             try:
-                await self.run_agent_cycle()
-                logger.info(f"Waiting {interval_seconds} seconds before next cycle")
-                await asyncio.sleep(interval_seconds)
-            except Exception as e:
-                logger.error(f"Error in orchestrator cycle: {str(e)}")
-                await asyncio.sleep(10)  # Short delay on error before retrying
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                # Not supported by Windows event loops; Ctrl+C still raises KeyboardInterrupt
+                pass
+
+        # Cycles start on a fixed cadence, however long each one takes
+        deadline = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                cycle = asyncio.create_task(self.run_agent_cycle())
+                stopped = asyncio.create_task(self._stop.wait())
+                await asyncio.wait({cycle, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                stopped.cancel()
+                if not cycle.done():
+                    cycle.cancel()
+                    await asyncio.gather(cycle, return_exceptions=True)
+                    break
+
+                try:
+                    cycle.result()
+                    deadline += interval_seconds
+                except Exception as e:
+                    logger.error("Error in orchestrator cycle: %s", e)
+                    deadline = time.monotonic() + 10  # Short delay on error before retrying
+
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    logger.info("Waiting %.0f seconds before next cycle", delay)
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    # The cycle overran its slot: start the next one now without
+                    # trying to catch up on the missed ones
+                    deadline = time.monotonic()
+        finally:
+            for sig in signals:
+                try:
+                    loop.remove_signal_handler(sig)
+                except NotImplementedError:
+                    pass
+        logger.info("Agent Orchestrator stopped")
 
 async def main():
     """Main entry point."""
+    orchestrator = None
     try:
         orchestrator = AgentOrchestrator()
         await orchestrator.run()
     except Exception as e:
-        logger.error(f"Fatal error: {str(e)}")
+        logger.error("Fatal error: %s", e)
         raise
+    finally:
+        if orchestrator is not None:
+            await orchestrator.aclose()
+        # Agents created without the orchestrator's session share a class-level pool
+        await BaseAgent.aclose()
 
 if __name__ == "__main__":
-    # Create example .env file if it doesn't exist
-    if not os.path.exists(".env"):
-        with open(".env.example", "w") as f:
-            f.write("""# GitHub Configuration
-GITHUB_TOKEN=your_github_token_here
-GITHUB_REPO=owner/repository_name
-""")
-        logger.info("Created .env.example file. Please configure with your GitHub credentials.")
-    
-    # Run the application
-    asyncio.run(main())
+    # Use libuv's event loop for the agents' HTTP fan-out when uvloop is installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -0,0 +1,20 @@
+import pytest
+from agents.base_agent import BaseAgent, ETAG_TTL_SECONDS
+from agents.gh_cache import ShaCache
+from agents.query_coalescer import QueryCoalescer
+
+@pytest.fixture(autouse=True)
+def _reset_shared_state():
+    """Start each test with empty caches and rate-limit state shared by all agents."""
+    BaseAgent._cache = ShaCache(ttl=ETAG_TTL_SECONDS)
+    BaseAgent._coalescer = QueryCoalescer()
+    BaseAgent._rate_limiters.clear()
+    yield
+
+@pytest.fixture
+def agent(request):
+    """Create an instance of the test class's `agent_class`, with its login already known."""
+    agent = request.cls.agent_class("fake-token", "owner/repo")
+    # Known up front, so no test looks the bot up on GitHub
+    agent._bot_login = "test-bot"
+    return agent
@@ -1,72 +1,41 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+import aiohttp
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from unittest.mock import Mock, AsyncMock
 from datetime import datetime
-from github import Github, Auth, GithubException
-from src.agents.specification_agent import SpecificationAgent
-from src.agents.developer_agent import DeveloperAgent
-from src.agents.review_agent import ReviewAgent
-from src.agents.merge_agent import MergeAgent
-
-class MockAuth(Auth.Auth):
-    """Mock Auth class that inherits from github.Auth.Auth."""
-    def __init__(self, token):
-        self._token = token
-
-    @property
-    def token(self) -> str:
-        return self._token
-
-    @property
-    def token_type(self) -> str:
-        return "Bearer"
-
-    @property
-    def token_value(self) -> str:
-        return self._token
-
-@pytest.fixture
-def mock_auth():
-    """Create a mock GitHub Auth token."""
-    with patch('github.Auth.Token') as mock_auth:
-        mock_auth.return_value = MockAuth("fake-token")
-        return mock_auth
-
-@pytest.fixture
-def mock_github(mock_auth):
-    """Create a mock GitHub client."""
-    mock = Mock(spec=Github)
-    mock.get_user.return_value.login = "test-bot"
-    # Setup the mock repository
-    mock_repo = Mock()
-    mock_repo.get_pulls.return_value = []
-    mock.get_repo.return_value = mock_repo
-    return mock
-
-@pytest.fixture
-def mock_repo(mock_github):
-    """Get the mock repository from mock_github."""
-    return mock_github.get_repo.return_value
+from agents import base_agent
+from agents.base_agent import BaseAgent, PRSnapshot
+from agents.gh_cache import ShaCache
+from agents.specification_agent import SpecificationAgent
+from agents.developer_agent import DeveloperAgent
+from agents.review_agent import ReviewAgent
+from agents.merge_agent import MergeAgent
+from agents.query_coalescer import QueryCoalescer
+from agents.rate_limiter import RateLimiter
+import main
+from main import AgentOrchestrator, ENV_EXAMPLE
 
 class TestSpecificationAgent:
     """Test suite for SpecificationAgent."""
 
-    @pytest.fixture
-    def agent(self, mock_github, mock_auth):
-        with patch('github.Github', return_value=mock_github):
-            with patch('github.Auth.Token', return_value=mock_auth.return_value):
-                return SpecificationAgent("fake-token", "owner/repo")
+    agent_class = SpecificationAgent
 
-    @pytest.mark.asyncio
     async def test_create_initial_specifications(self, agent):
         """Test creation of initial specifications."""
         # Mock successful branch creation
-        agent.create_branch = Mock(return_value=True)
+        agent.create_branch = AsyncMock(return_value=True)
         
         # Mock file creation
-        agent.repo.create_file = Mock()
+        agent.put_file = AsyncMock()
         
         # Mock PR creation
-        agent.create_pull_request = Mock()
+        agent.create_pull_request = AsyncMock()
         
         await agent.create_initial_specifications()
         
@@ -74,26 +43,57 @@ class TestSpecificationAgent:
         agent.create_branch.assert_called_once()
         
         # Verify file was created
-        agent.repo.create_file.assert_called_once()
+        agent.put_file.assert_called_once()
         
         # Verify PR was created
         agent.create_pull_request.assert_called_once()
         
         # Check specification content
-        spec_content = agent.repo.create_file.call_args[0][2]
+        spec_content = agent.put_file.call_args[0][2]
         assert "user-auth" in spec_content
         assert "JWT token implementation" in spec_content
 
+    async def test_get_feature_prs(self, agent):
+        """Test implementation PRs are indexed by feature id in one listing."""
+        agent.list_pulls = AsyncMock(return_value=[
+            {"title": "feat: user-auth - Retry", "state": "closed", "merged_at": None},
+            {"title": "Feat: user-auth - Implement", "state": "open", "merged_at": None},
+            {"title": "feat: search", "state": "closed", "merged_at": "2024-01-01T00:00:00Z"},
+            {"title": "docs: update readme", "state": "open", "merged_at": None}
+        ])
+
+        prs = await agent.get_feature_prs()
+
+        assert set(prs) == {"user-auth", "search"}
+        assert prs["user-auth"]["state"] == "open"
+        agent.list_pulls.assert_awaited_once()
+
+    async def test_rest_get_revalidates_etag(self, agent):
+        """Test cached REST responses are revalidated with If-None-Match."""
+        agent._throttled = AsyncMock(side_effect=[
+            (200, {"ETag": '"v1"'}, [{"number": 1}]),
+            (304, {"ETag": '"v1"'}, None)
+        ])
+
+        first = await agent._rest_async("GET", "/repos/owner/repo/pulls")
+        # Served from cache within the TTL without a request
+        assert await agent._rest_async("GET", "/repos/owner/repo/pulls") == first
+        assert agent._throttled.await_count == 1
+
+        # Expire the entry so the next call revalidates
+        url = "https://api.github.com/repos/owner/repo/pulls"
+        etag, body, _ = BaseAgent._cache.get_etag(url)
+        BaseAgent._cache._etags[url] = (etag, body, time.monotonic() - 60)
+        assert await agent._rest_async("GET", "/repos/owner/repo/pulls") == first
+        assert agent._throttled.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+        # The fresh hit and the 304 both count as hits
+        assert BaseAgent._cache.take_stats() == (2, 1)
+
 class TestDeveloperAgent:
     """Test suite for DeveloperAgent."""
 
-    @pytest.fixture
-    def agent(self, mock_github, mock_auth):
-        with patch('github.Github', return_value=mock_github):
-            with patch('github.Auth.Token', return_value=mock_auth.return_value):
-                return DeveloperAgent("fake-token", "owner/repo")
+    agent_class = DeveloperAgent
 
-    @pytest.mark.asyncio
     async def test_implement_feature(self, agent):
         """Test feature implementation."""
         feature = {
@@ -103,78 +103,218 @@ class TestDeveloperAgent:
         }
         
         # Mock successful branch creation
-        agent.create_branch = Mock(return_value=True)
+        agent.create_branch = AsyncMock(return_value=True)
         
         # Mock file creation
-        agent.repo.create_file = Mock()
+        agent.commit_files = AsyncMock(return_value=True)
         
         # Mock PR creation
-        agent.create_pull_request = Mock()
+        agent.create_pull_request = AsyncMock()
         
         await agent.implement_feature(feature)
         
         # Verify branch was created
         agent.create_branch.assert_called_once()
         
-        # Verify files were created
-        assert agent.repo.create_file.call_count == 4  # user.py, jwt_handler.py, password_handler.py, test_user_auth.py
+        # Verify files were created in a single commit
+        agent.commit_files.assert_called_once()
+        files = agent.commit_files.call_args[0][1]
+        assert len(files) == 4  # user.py, jwt_handler.py, password_handler.py, test_user_auth.py
         
         # Verify PR was created
         agent.create_pull_request.assert_called_once()
 
+    async def test_commit_files_single_commit(self, agent):
+        """Test files are written as blobs, one tree and one commit."""
+        agent._throttled = AsyncMock(return_value=(200, {}, {"object": {"sha": "parent"}}))
+        agent._rest_async = AsyncMock(side_effect=[
+            {"tree": {"sha": "base-tree"}},
+            {"sha": "blob-a"},
+            {"sha": "blob-b"},
+            {"sha": "tree"},
+            {"sha": "commit"},
+            {}
+        ])
+        files = {"src/a.py": "a = 1\n", "src/b.py": "b = 2\n"}
+
+        assert await agent.commit_files("feat/x", files, "Add files")
+
+        calls = [(c.args[0], c.args[1].rsplit("/git/", 1)[1]) for c in agent._rest_async.call_args_list]
+        assert calls == [("GET", "commits/parent"), ("POST", "blobs"), ("POST", "blobs"),
+                         ("POST", "trees"), ("POST", "commits"), ("PATCH", "refs/heads/feat/x")]
+        tree = agent._rest_async.call_args_list[3].kwargs["json"]
+        assert tree["base_tree"] == "base-tree"
+        assert [entry["sha"] for entry in tree["tree"]] == ["blob-a", "blob-b"]
+        assert agent._rest_async.call_args_list[4].kwargs["json"]["parents"] == ["parent"]
+
 class TestReviewAgent:
     """Test suite for ReviewAgent."""
 
-    @pytest.fixture
-    def agent(self, mock_github, mock_auth):
-        with patch('github.Github', return_value=mock_github):
-            with patch('github.Auth.Token', return_value=mock_auth.return_value):
-                return ReviewAgent("fake-token", "owner/repo")
+    agent_class = ReviewAgent
 
     def test_check_commit_messages(self, agent):
         """Test commit message validation."""
-        # Mock PR with commits
-        pr = Mock()
-        commit1 = Mock()
-        commit1.commit.message = "feat: add user authentication"
-        commit1.sha = "abc123"
-        
-        commit2 = Mock()
-        commit2.commit.message = "invalid commit message"
-        commit2.sha = "def456"
-        
-        pr.get_commits.return_value = [commit1, commit2]
+        # Mock PR commits
+        commit1 = {"sha": "abc123", "message": "feat: add user authentication"}
+        commit2 = {"sha": "def456", "message": "invalid commit message"}
         
-        issues = agent.check_commit_messages(pr)
+        issues = agent.check_commit_messages([commit1, commit2])
         
         # Should flag the invalid commit message
         assert len(issues) == 1
         assert "def456" in issues[0]
         assert "conventional commit format" in issues[0]
 
+    def test_check_commit_messages_extended_types(self, agent):
+        """Test scoped, breaking and newer conventional commit types are accepted."""
+        commits = [
+            {"sha": "abc123", "message": "perf(api): batch review requests"},
+            {"sha": "def456", "message": "feat!: drop the legacy token format"},
+            {"sha": "ghi789", "message": "ci: run the suite on every push"}
+        ]
+
+        assert agent.check_commit_messages(commits) == []
+
+    def test_check_commit_message_subject_length(self, agent):
+        """Test only the first line counts towards the subject length."""
+        long_body = {"sha": "abc123", "message": "fix: short subject\n\n" + "x" * 100}
+        long_subject = {"sha": "def456", "message": "fix: " + "x" * 80}
+
+        issues = agent.check_commit_messages([long_body, long_subject])
+
+        assert len(issues) == 1
+        assert "def456" in issues[0]
+        assert "too long subject line" in issues[0]
+
+    async def test_process_skips_reviewed_prs(self, agent):
+        """Test already-reviewed PRs are skipped without further requests."""
+        agent.get_open_prs = AsyncMock(return_value=[
+            {"number": 1, "reviewer_logins": {"test-bot", "someone"}},
+            {"number": 2, "reviewer_logins": {"someone"}}
+        ])
+        agent._review_pull_request = AsyncMock()
+        agent._bot_login = None
+        agent._throttled = AsyncMock(return_value=(200, {}, {"login": "test-bot"}))
+
+        await agent.process()
+        await agent.process()
+
+        assert [call.args[0]["number"] for call in agent._review_pull_request.await_args_list] == [2, 2]
+        agent._throttled.assert_awaited_once_with("GET", "https://api.github.com/user", token="fake-token")
+
+    async def test_get_open_prs_paginates_graphql(self, agent):
+        """Test open PRs are listed through paginated GraphQL queries."""
+        node = {
+            "number": 1,
+            "title": "feat: add user auth",
+            "body": "Implements user authentication",
+            "author": {"login": "dev-bot"},
+            "url": "https://github.com/owner/repo/pull/1",
+            "createdAt": "2024-01-01T00:00:00Z",
+            "reviews": {"nodes": [{"author": {"login": "test-bot"}}, {"author": None}]}
+        }
+        agent._gql = AsyncMock(side_effect=[
+            {"repository": {"pullRequests": {
+                "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+                "nodes": [node]
+            }}},
+            {"repository": {"pullRequests": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [dict(node, number=2, author=None)]
+            }}}
+        ])
+
+        prs = await agent.get_open_prs()
+
+        assert [pr["number"] for pr in prs] == [1, 2]
+        assert prs[0]["user"] == "dev-bot"
+        assert prs[0]["created_at"] == "2024-01-01T00:00:00+00:00"
+        assert prs[0]["reviewer_logins"] == {"test-bot"}
+        assert prs[1]["user"] is None
+        assert agent._gql.call_args_list[1][0][1]["cursor"] == "c1"
+
+    async def test_check_code(self, agent):
+        """Test code smells are detected in Python patches."""
+        file = {
+            "filename": "src/module.py",
+            "patch": "+from os import *\n+def run():\n+    try:\n+        pass\n+    except:\n+        pass"
+        }
+
+        issues = await agent.check_code([file])
+
+        assert any("wildcard imports" in issue for issue in issues)
+        assert any("Missing docstrings" in issue for issue in issues)
+        assert any("Bare except" in issue for issue in issues)
+        assert not any("Lines too long" in issue for issue in issues)
+
+    async def test_check_code_long_lines(self, agent):
+        """Test only added lines over 88 characters are flagged."""
+        at_limit = {"filename": "src/ok.py", "patch": '"""Doc."""\n+' + "x" * 87 + "\n"}
+        over_limit = {"filename": "src/long.py", "patch": '"""Doc."""\n+' + "x" * 88 + "\n"}
+        removed = {"filename": "src/removed.py", "patch": '"""Doc."""\n-' + "x" * 100 + "\n"}
+
+        issues = await agent.check_code([at_limit, over_limit, removed])
+
+        assert issues == ["⚠️ Lines too long in `src/long.py` (>88 chars)"]
+
+    async def test_check_tests_batches_contents(self, agent):
+        """Test test file contents are fetched in one aliased GraphQL query."""
+        source = {"filename": "src/auth.py"}
+        test = {"filename": "tests/test_models.py"}
+        agent._gql = AsyncMock(return_value={"repository": {
+            "f0": {"text": "def check_models():\n    pass\n"}
+        }})
+
+        issues = await agent.check_tests([source, test], "abc123")
+
+        assert "❌ Missing tests for `src/auth.py`" in issues
+        assert "❌ No assertions found in `tests/test_models.py`" in issues
+        agent._gql.assert_awaited_once()
+        assert agent._gql.call_args[0][1]["f0"] == "abc123:tests/test_models.py"
+
+    async def test_blob_texts_cached_by_sha(self, agent):
+        """Test blobs read at a commit SHA are only fetched once."""
+        sha = "a" * 40
+        agent._gql = AsyncMock(return_value={"repository": {"f0": {"text": "assert True"}}})
+
+        first = await agent.get_blob_texts(["tests/test_a.py"], sha)
+        second = await agent.get_blob_texts(["tests/test_a.py"], sha)
+
+        assert first == second == {"tests/test_a.py": "assert True"}
+        agent._gql.assert_awaited_once()
+
+    async def test_process_reviews_prs_concurrently(self, agent):
+        """Test one failing PR review does not stop the others."""
+        agent.get_open_prs = AsyncMock(return_value=[
+            {"number": 1, "reviewer_logins": set()},
+            {"number": 2, "reviewer_logins": set()}
+        ])
+        agent._review_pull_request = AsyncMock(side_effect=[RuntimeError("boom"), None])
+
+        await agent.process()
+
+        assert agent._review_pull_request.await_count == 2
+
 class TestMergeAgent:
     """Test suite for MergeAgent."""
 
-    @pytest.fixture
-    def agent(self, mock_github, mock_auth):
-        with patch('github.Github', return_value=mock_github):
-            with patch('github.Auth.Token', return_value=mock_auth.return_value):
-                return MergeAgent("fake-token", "owner/repo")
+    agent_class = MergeAgent
 
-    @pytest.mark.asyncio
     async def test_evaluate_pr_for_merge(self, agent):
         """Test PR evaluation for merging."""
         pr_dict = {"number": 1}
         
-        # Mock PR
-        pr = Mock()
-        pr.number = 1
-        pr.title = "feat: add user auth"
-        pr.body = "Implements user authentication"
-        pr.head.ref = "feature-branch"
-        
-        # Mock PR retrieval
-        agent.repo.get_pull.return_value = pr
+        # Mock PR snapshot fetched via GraphQL
+        agent.fetch_pr_snapshot = AsyncMock(return_value=PRSnapshot(
+            number=1,
+            title="feat: add user auth",
+            body="Implements user authentication",
+            head_ref="feature-branch",
+            head_sha="def456",
+            base_sha="abc123",
+            head_base_sha="abc123",
+            reviews=[{"user": "review-bot", "state": "APPROVED"}]
+        ))
         
         # Mock approval status
         agent.is_pr_approved = Mock(return_value=True)
@@ -191,7 +331,7 @@ class TestMergeAgent:
         agent.check_merge_criteria = AsyncMock(return_value=merge_status)
         
         # Mock merge operation
-        agent.merge_pr = Mock()
+        agent.merge_pr = AsyncMock()
         
         await agent.evaluate_pr_for_merge(pr_dict)
         
@@ -202,3 +342,444 @@ class TestMergeAgent:
         commit_msg = agent.merge_pr.call_args[0][1]
         assert "feat: add user auth" in commit_msg
         assert "✅" in commit_msg  # Should show passing checks
+        assert "- review-bot: APPROVED" in commit_msg
+
+    def test_generate_blocking_comment(self, agent):
+        """Test blocking issues are listed in the comment."""
+        comment = agent.generate_blocking_comment({
+            "blocking_issues": ["CI checks must pass", "All tests must pass"]
+        })
+
+        assert comment.splitlines()[4:6] == [
+            "- ❌ CI checks must pass",
+            "- ❌ All tests must pass"
+        ]
+        assert comment.endswith("\n\nPlease address these issues and request a new review.")
+
+    async def test_fetch_pr_snapshot(self, agent):
+        """Test the PR snapshot is parsed from a single GraphQL response."""
+        agent._gql = AsyncMock(return_value={"repository": {"pullRequest": {
+            "number": 1,
+            "title": "feat: add user auth",
+            "body": None,
+            "headRefName": "feature-branch",
+            "headRefOid": "def456",
+            "baseRefOid": "abc123",
+            "baseRef": {"target": {"oid": "abc123"}},
+            "commits": {
+                "pageInfo": {"hasNextPage": False},
+                "nodes": [{"commit": {"oid": "def456", "message": "feat: add user auth"}}]
+            },
+            "lastCommit": {"nodes": [{"commit": {"statusCheckRollup": {"contexts": {"nodes": [
+                {"name": "tests", "conclusion": "SUCCESS"},
+                {"context": "ci/lint", "state": "FAILURE"},
+                {"name": "deploy", "conclusion": None}
+            ]}}}}]},
+            "reviews": {"nodes": [{"author": {"login": "review-bot"}, "state": "APPROVED"}]}
+        }}})
+
+        snapshot = await agent.fetch_pr_snapshot(1)
+
+        agent._gql.assert_awaited_once()
+        assert snapshot.head_ref == "feature-branch"
+        assert snapshot.commits == [{"sha": "def456", "message": "feat: add user auth"}]
+        assert snapshot.checks == [
+            {"name": "tests", "conclusion": "success"},
+            {"name": "ci/lint", "conclusion": "failure"},
+            {"name": "deploy", "conclusion": None}
+        ]
+        assert snapshot.reviews == [{"user": "review-bot", "state": "APPROVED"}]
+        assert snapshot.base_sha == snapshot.head_base_sha == "abc123"
+
+    async def test_check_merge_criteria(self, agent):
+        """Test merge criteria are derived from the PR snapshot."""
+        snapshot = PRSnapshot(
+            number=1,
+            title="feat: add user auth",
+            body=None,
+            head_ref="feature-branch",
+            head_sha="fff000",
+            base_sha="abc123",
+            head_base_sha="def456",
+            checks=[
+                {"name": "lint", "conclusion": "success"},
+                {"name": "tests", "conclusion": "failure"}
+            ],
+            reviews=[{"user": "review-bot", "state": "APPROVED"}]
+        )
+
+        status = await agent.check_merge_criteria(snapshot)
+
+        assert not status["can_merge"]
+        assert not status["checks_passed"]
+        assert not status["tests_passed"]
+        assert status["review_requirements_met"]
+        assert not status["branch_up_to_date"]
+        assert "Branch must be up to date with base" in status["blocking_issues"]
+
+class TestBaseAgent:
+    """Test suite for behaviour shared by all agents."""
+
+    def test_token_rotation_skips_depleted_tokens(self):
+        """Test requests rotate across tokens and skip depleted ones."""
+        # BaseAgent is abstract; any concrete agent exercises the rotation
+        agent = MergeAgent(["token-a", "token-b", "token-c"], "owner/repo")
+        BaseAgent._limiter_for("token-b").update({
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": "4102444800"
+        })
+
+        picked = [agent._next_token() for _ in range(4)]
+
+        assert picked == ["token-a", "token-c", "token-c", "token-a"]
+        assert not agent.get_rate_status()["depleted"]
+
+    def test_graphql_budget_does_not_deplete_rest(self):
+        """Test an exhausted GraphQL budget leaves REST requests on the same token alone."""
+        agent = MergeAgent(["token-a", "token-b"], "owner/repo")
+        for token in ("token-a", "token-b"):
+            BaseAgent._limiter_for(token, "graphql").update({
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": "4102444800"
+            })
+
+        assert agent.get_rate_status("graphql")["depleted"]
+        assert not agent.get_rate_status()["depleted"]
+        assert [agent._next_token() for _ in range(2)] == ["token-a", "token-b"]
+
+@pytest.fixture
+async def serve(monkeypatch):
+    """Point the agents at a local server that answers every request with a handler."""
+    servers = []
+
+    async def start(handler):
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+        url = str(server.make_url("")).rstrip("/")
+        monkeypatch.setattr(base_agent, "REST_URL", url)
+        monkeypatch.setattr(base_agent, "GRAPHQL_URL", f"{url}/graphql")
+
+    yield start
+    await BaseAgent.aclose()
+    for server in servers:
+        await server.close()
+
+class TestThrottledRequests:
+    """Test suite for requests sent through BaseAgent._throttled."""
+
+    agent_class = MergeAgent
+
+    async def test_retries_after_429(self, agent, serve):
+        """Test a 429 response is retried once Retry-After has passed."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.path)
+            if len(calls) == 1:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            return web.json_response({"ok": True})
+        await serve(handler)
+
+        status, _, body = await agent._throttled("GET", f"{base_agent.REST_URL}/rate")
+
+        assert (status, body) == (200, {"ok": True})
+        assert calls == ["/rate", "/rate"]
+
+    async def test_304_reuses_cached_body(self, agent, serve):
+        """Test a GET revalidated with its ETag returns the body cached with it."""
+        # Revalidate on every read instead of serving fresh entries from memory
+        BaseAgent._cache = ShaCache(ttl=0)
+        validators = []
+
+        async def handler(request):
+            validators.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304, headers={"ETag": '"v1"'})
+            return web.json_response([1, 2], headers={"ETag": '"v1"'})
+        await serve(handler)
+
+        first = await agent._rest_async("GET", "/repos/owner/repo/pulls")
+        second = await agent._rest_async("GET", "/repos/owner/repo/pulls")
+
+        assert first == second == [1, 2]
+        assert validators == [None, '"v1"']
+
+    async def test_non_rate_limit_403_raises(self, agent, serve):
+        """Test a 403 that is not a rate limit fails without being retried."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.path)
+            return web.Response(status=403, text="Resource not accessible by integration")
+        await serve(handler)
+
+        with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+            await agent._throttled("GET", f"{base_agent.REST_URL}/forbidden")
+
+        assert excinfo.value.status == 403
+        assert len(calls) == 1
+
+    async def test_updates_the_charged_resource(self, agent, serve):
+        """Test rate-limit headers update the bucket GitHub says it charged."""
+        async def handler(request):
+            return web.json_response({"data": {}}, headers={
+                "X-RateLimit-Resource": "graphql",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": "4102444800"
+            })
+        await serve(handler)
+
+        await agent._throttled("POST", base_agent.GRAPHQL_URL, json={"query": "{}"})
+
+        assert agent.get_rate_status("graphql")["depleted"]
+        assert not agent.get_rate_status()["depleted"]
+
+    async def test_in_flight_requests_are_bounded(self, agent, serve):
+        """Test no more requests are in flight at once than the semaphore allows."""
+        agent._gh_sem = asyncio.Semaphore(2)
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return web.json_response({})
+        await serve(handler)
+
+        await asyncio.gather(*(agent._throttled("GET", f"{base_agent.REST_URL}/slow")
+                               for _ in range(6)))
+
+        assert peak == 2
+
+class TestRateLimiter:
+    """Test suite for RateLimiter."""
+
+    def test_retry_delay(self):
+        """Test throttled responses map to the right retry delay."""
+        limiter = RateLimiter()
+
+        assert limiter.retry_delay(200, {}, "", 0) is None
+        assert limiter.retry_delay(429, {"Retry-After": "7"}, "", 0) == 7
+        assert 4 <= limiter.retry_delay(403, {}, "You have exceeded a secondary rate limit", 3) <= 8
+        assert limiter.retry_delay(403, {}, "secondary rate limit", 10) is None
+        assert limiter.retry_delay(403, {}, "Resource not accessible", 0) is None
+
+    def test_depleted_budget(self):
+        """Test the budget is depleted only below the threshold before reset."""
+        limiter = RateLimiter(threshold=100)
+        limiter.update({"X-RateLimit-Remaining": "50", "X-RateLimit-Reset": "4102444800"})
+        assert limiter.is_depleted()
+
+        limiter.update({"X-RateLimit-Remaining": "4000"})
+        assert not limiter.is_depleted()
+
+class TestQueryCoalescer:
+    """Test suite for QueryCoalescer."""
+
+    async def test_concurrent_callers_share_one_call(self):
+        """Test concurrent identical queries share a single call."""
+        coalescer = QueryCoalescer()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return {"prs": []}
+
+        results = await asyncio.gather(*(coalescer.get("open-prs", fetch) for _ in range(3)))
+
+        assert results == [{"prs": []}] * 3
+        assert len(calls) == 1
+
+    async def test_failures_are_not_cached(self):
+        """Test a failed query is retried by the next caller."""
+        coalescer = QueryCoalescer()
+        fetch = AsyncMock(side_effect=[RuntimeError("boom"), "ok"])
+
+        with pytest.raises(RuntimeError):
+            await coalescer.get("key", fetch)
+
+        assert await coalescer.get("key", fetch) == "ok"
+
+@pytest.fixture
+async def orchestrator(monkeypatch):
+    """Create an orchestrator configured from a fake environment."""
+    monkeypatch.setenv("GITHUB_TOKEN", "fake-token")
+    monkeypatch.setenv("GITHUB_REPO", "owner/repo")
+    orchestrator = AgentOrchestrator()
+    # Known up front, so no test looks the bot up on GitHub
+    orchestrator.review_agent._bot_login = "test-bot"
+    yield orchestrator
+    await orchestrator.aclose()
+
+def fake_github(orchestrator, files):
+    """Serve one approved open PR to the review and merge agents, recording writes."""
+    reviews = [{"author": {"login": "alice"}, "state": "APPROVED"}]
+    writes = []
+
+    async def execute_gql(query, variables):
+        if "pullRequests(" in query:
+            return {"repository": {"pullRequests": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [{"number": 1, "title": "feat: add login", "body": None,
+                           "author": {"login": "dev"}, "url": "u",
+                           "createdAt": "2024-01-01T00:00:00Z", "reviews": {"nodes": []}}]
+            }}}
+        return {"repository": {"pullRequest": {
+            "number": 1,
+            "title": "feat: add login",
+            "body": None,
+            "headRefName": "feat/login",
+            "headRefOid": "def456",
+            "baseRefOid": "abc123",
+            "baseRef": {"target": {"oid": "abc123"}},
+            "commits": {
+                "pageInfo": {"hasNextPage": False},
+                "nodes": [{"commit": {"oid": "def456", "message": "feat: add login"}}]
+            },
+            "lastCommit": {"nodes": [{"commit": {"statusCheckRollup": {"contexts": {"nodes": [
+                {"name": "tests", "conclusion": "SUCCESS"}
+            ]}}}}]},
+            "reviews": {"nodes": list(reviews)}
+        }}}
+
+    async def rest_async(method, path, params=None, **kwargs):
+        if method == "GET":
+            return files
+        writes.append((method, path, kwargs.get("json")))
+        if path.endswith("/reviews"):
+            state = {"APPROVE": "APPROVED", "REQUEST_CHANGES": "CHANGES_REQUESTED"}
+            reviews.append({"author": {"login": "test-bot"},
+                            "state": state.get(kwargs["json"]["event"], "COMMENTED")})
+        return {}
+
+    for agent in (orchestrator.review_agent, orchestrator.merge_agent):
+        agent._execute_gql = execute_gql
+        agent._rest_async = rest_async
+    return writes
+
+class TestAgentOrchestrator:
+    """Test suite for AgentOrchestrator."""
+
+    async def test_pipeline_does_not_merge_after_requesting_changes(self, orchestrator):
+        """Test the merge step sees a review posted earlier in the same pass."""
+        writes = fake_github(orchestrator, [{
+            "filename": "src/app.py",
+            "patch": '+"""App."""\n+try:\n+    run()\n+except:\n+    pass'
+        }])
+
+        await orchestrator._run_pr_pipeline()
+
+        assert [w[2]["event"] for w in writes if w[1].endswith("/reviews")] == ["REQUEST_CHANGES"]
+        assert not [w for w in writes if w[0] == "PUT"]
+
+    async def test_pipeline_merges_after_approving(self, orchestrator):
+        """Test a PR the bot approves is merged in the same pass."""
+        writes = fake_github(orchestrator, [])
+
+        await orchestrator._run_pr_pipeline()
+
+        assert [w[2]["event"] for w in writes if w[1].endswith("/reviews")] == ["APPROVE"]
+        assert [w[1] for w in writes if w[0] == "PUT"] == ["/repos/owner/repo/pulls/1/merge"]
+
+    async def test_process_pr_merges_after_failed_review(self, orchestrator):
+        """Test a failed review does not hold back merge evaluation."""
+        orchestrator.review_agent.review_pull_request = AsyncMock(side_effect=RuntimeError("boom"))
+        orchestrator.merge_agent.evaluate_pr_for_merge = AsyncMock()
+
+        await orchestrator._process_pr({"number": 1}, review=True)
+
+        orchestrator.merge_agent.evaluate_pr_for_merge.assert_awaited_once_with({"number": 1})
+
+    async def test_pipeline_skips_review_of_reviewed_prs(self, orchestrator):
+        """Test PRs the bot already reviewed only go through merge evaluation."""
+        review_agent, merge_agent = orchestrator.review_agent, orchestrator.merge_agent
+        review_agent.get_open_prs = AsyncMock(return_value=[
+            {"number": 1, "reviewer_logins": set()},
+            {"number": 2, "reviewer_logins": {"test-bot"}}
+        ])
+        review_agent.review_pull_request = AsyncMock()
+        merge_agent.evaluate_pr_for_merge = AsyncMock()
+
+        await orchestrator._run_pr_pipeline()
+
+        assert [c.args[0]["number"] for c in review_agent.review_pull_request.await_args_list] == [1]
+        assert merge_agent.evaluate_pr_for_merge.await_count == 2
+
+    async def test_run_keeps_a_fixed_cadence(self, orchestrator):
+        """Test cycles start one interval apart, however long each one takes."""
+        starts = []
+
+        async def cycle():
+            starts.append(time.monotonic())
+            if len(starts) == 3:
+                orchestrator.stop()
+            await asyncio.sleep(0.03)
+
+        orchestrator.run_agent_cycle = cycle
+        await asyncio.wait_for(orchestrator.run(interval_seconds=0.1), 2)
+
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        assert len(gaps) == 2
+        assert all(0.09 <= gap < 0.125 for gap in gaps)
+
+    @pytest.mark.skipif(sys.platform == "win32",
+                        reason="Windows event loops cannot install signal handlers")
+    async def test_sigterm_cancels_running_cycle(self, orchestrator):
+        """Test SIGTERM cancels the running cycle and ends the run."""
+        cancelled = []
+
+        async def cycle():
+            os.kill(os.getpid(), signal.SIGTERM)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        orchestrator.run_agent_cycle = cycle
+        await asyncio.wait_for(orchestrator.run(interval_seconds=10), 2)
+
+        assert cancelled == [True]
+
+    def test_agents_built_on_first_use(self, monkeypatch):
+        """Test agents and their HTTP session are only created when first read."""
+        monkeypatch.setenv("GITHUB_TOKEN", "fake-token")
+        monkeypatch.setenv("GITHUB_REPO", "owner/repo")
+
+        # No running event loop is needed until an agent is used
+        orchestrator = AgentOrchestrator()
+
+        assert "review_agent" not in vars(orchestrator)
+        assert orchestrator._http is None
+
+    def test_missing_config_writes_env_example(self, monkeypatch, tmp_path):
+        """Test missing config copies the tracked .env.example without overwriting one."""
+        monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+        monkeypatch.delenv("GITHUB_REPO", raising=False)
+        monkeypatch.chdir(tmp_path)
+
+        with pytest.raises(ValueError):
+            AgentOrchestrator()
+        assert (tmp_path / ".env.example").read_text() == ENV_EXAMPLE.read_text()
+
+        (tmp_path / ".env.example").write_text("edited")
+        with pytest.raises(ValueError):
+            AgentOrchestrator()
+        assert (tmp_path / ".env.example").read_text() == "edited"
+
+    def test_missing_template_still_reports_missing_config(self, monkeypatch, tmp_path):
+        """Test a missing .env.example template does not hide the configuration error."""
+        monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+        monkeypatch.delenv("GITHUB_REPO", raising=False)
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(main, "ENV_EXAMPLE", tmp_path / "missing" / ".env.example")
+
+        with pytest.raises(ValueError, match="must be configured"):
+            AgentOrchestrator()
+        assert not (tmp_path / ".env.example").exists()